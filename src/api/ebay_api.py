@@ -3,9 +3,202 @@ import os
 import requests
 import base64
 import time
-import json
+import tempfile
+import threading
+import zlib
+import orjson
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from urllib.parse import urlencode
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+from src.utils.stats import item_arrays
+
+# Configuration
+OAUTH_TOKEN_URL = "https://api.ebay.com/identity/v1/oauth2/token"
+OAUTH_SCOPE = "https://api.ebay.com/oauth/api_scope"
+# The token request body never changes, so it is form-encoded once
+OAUTH_TOKEN_BODY = urlencode({"grant_type": "client_credentials", "scope": OAUTH_SCOPE})
+FINDING_API_URL = "https://svcs.ebay.com/services/search/FindingService/v1"
+BROWSE_SEARCH_URL = "https://api.ebay.com/buy/browse/v1/item_summary/search"
+API_TIMEOUT = 15
+MARKETPLACE_ID = "EBAY_US"
+TOKEN_EXPIRY_MARGIN = 60  # Refresh tokens this many seconds before eBay expires them
+# Error messages quote at most this much of an eBay response body
+MAX_ERROR_BODY = 500
+TOKEN_CACHE_FILE = Path("data") / "ebay_token.json"
+PLACEHOLDER_IMAGE = "https://via.placeholder.com/150"
+# Read-only so no caller can change the shared fee table
+FEE_RATES = MappingProxyType({
+    "Electronics": 0.12,
+    "Clothing": 0.13,
+    "Collectibles": 0.125,
+    "Home & Garden": 0.12,
+    "Toys": 0.125,
+    "Books": 0.145,
+    "Other": 0.13
+})
+DEFAULT_FEE_RATE = 0.13
+MOCK_CONDITIONS = ("New", "Used", "Like New", "For parts or not working")
+# Sidebar condition filter values mapped onto each source's vocabulary
+BROWSE_CONDITIONS = {"new": "NEW", "used": "USED"}
+FINDING_CONDITIONS = {"new": "New", "used": "Used"}
+MOCK_CONDITION_GROUPS = {"new": ("New",), "used": ("Used", "Like New")}
+
+@st.cache_resource
+def get_http_session():
+    """Return a shared requests session so eBay calls reuse pooled connections."""
+    session = requests.Session()
+    # urllib3 decodes br responses when the brotli package is installed
+    session.headers.update({
+        "Accept-Encoding": "br, gzip, deflate",
+        "X-EBAY-C-MARKETPLACE-ID": MARKETPLACE_ID
+    })
+    # Retry rate limiting and transient server errors, then hand the last response back to the caller
+    retries = Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        respect_retry_after_header=False,  # A long Retry-After would stall the rerun; back off briefly instead
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+    session.mount("https://", adapter)
+    return session
+
+_EMPTY = {}
+_NO_SHIPPING = [{}]
+
+def _parse_browse_item(item):
+    """Map one Browse API item summary onto the app's item dict."""
+    # Browse returns condition as a plain string; tolerate the object form too
+    condition = item.get("condition", "N/A")
+    if isinstance(condition, dict):
+        condition = condition.get("conditionDisplayName", "N/A")
+    return {
+        "id": item.get("itemId"),
+        "title": item.get("title"),
+        "url": item.get("itemWebUrl"),
+        "image": item.get("image", _EMPTY).get("imageUrl", PLACEHOLDER_IMAGE),
+        "price": float(item.get("price", _EMPTY).get("value", 0)),
+        "shipping": float((item.get("shippingOptions") or _NO_SHIPPING)[0].get("shippingCost", _EMPTY).get("value", 0)),
+        "end_time": item.get("itemEndDate", ""),
+        "watchers": item.get("watchCount", 0),
+        "condition": condition,
+        "sold": False
+    }
+
+def _browse_filter(filters):
+    """Build the Browse API filter string so price and condition are applied server-side."""
+    parts = ["soldStatus:{ACTIVE}"]
+    if filters:
+        parts.append(f"price:[{filters.get('min_price', 0)}..{filters.get('max_price', '')}]")
+        parts.append("priceCurrency:USD")
+        condition = BROWSE_CONDITIONS.get(filters.get("condition"))
+        if condition:
+            parts.append(f"conditions:{{{condition}}}")
+    return ",".join(parts)
+
+def _finding_item_filters(filters):
+    """Build Finding API itemFilter params so price and condition are applied server-side."""
+    if not filters:
+        return {}
+    item_filters = [("MinPrice", filters.get("min_price", 0))]
+    if filters.get("max_price") is not None:
+        item_filters.append(("MaxPrice", filters["max_price"]))
+    condition = FINDING_CONDITIONS.get(filters.get("condition"))
+    if condition:
+        item_filters.append(("Condition", condition))
+    params = {}
+    for i, (name, value) in enumerate(item_filters):
+        params[f"itemFilter({i}).name"] = name
+        params[f"itemFilter({i}).value"] = value
+    return params
+
+# Active and sold searches hit different endpoints, so they run side by side
+_fetch_executor = ThreadPoolExecutor(max_workers=4)
+
+class _FetchFailed(Exception):
+    """Raised inside the long-lived cache so failed fetches are not kept there."""
+
+    def __init__(self, items, error):
+        super().__init__(error)
+        self.items = items
+        self.error = error
+
+@st.cache_data(ttl=600, max_entries=256, show_spinner=False)
+def _fetch_items_ok(_api, query, sold, limit, use_mock, filters_key):
+    """Fetch items, memoizing only successful non-empty results for 10 minutes."""
+    filters = dict(filters_key) if filters_key else None
+    items, error = _api.fetch_items(query, sold=sold, filters=filters, limit=limit, use_mock=use_mock)
+    if error or not items:
+        raise _FetchFailed(items, error)
+    return items, item_arrays(items), error
+
+@st.cache_data(ttl=60, max_entries=256, show_spinner=False)
+def cached_fetch_items(_api, query, sold=False, limit=30, use_mock=True, filters_key=()):
+    """Fetch items through the API with positive and negative caching.
+
+    Successful results are served from a 10 minute cache. Errors and empty
+    results are only remembered for a minute, so retyping a bad query does
+    not hit eBay again but a transient failure clears quickly.
+    use_mock is passed per call because the API instance is shared by all sessions.
+    filters_key is the filter settings frozen with freeze_filters so it can be hashed.
+    Returns (items, fields, error); fields is the columnar item_arrays view, built
+    once per fetch rather than on every rerun.
+    """
+    try:
+        return _fetch_items_ok(_api, query, sold, limit, use_mock, filters_key)
+    except _FetchFailed as e:
+        return e.items, item_arrays(e.items), e.error
+
+def _with_script_context(ctx, func, *args, **kwargs):
+    """Run func in a worker thread attached to the calling script's run context.
+
+    Pool threads are reused across sessions, so the thread's previous context
+    is put back afterwards and a task submitted without one runs without one.
+    """
+    thread = threading.current_thread()
+    previous = get_script_run_ctx(suppress_warning=True)
+    if ctx is not None:
+        add_script_run_ctx(thread, ctx)
+    else:
+        setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, previous)
+
+def cached_fetch_active_and_sold(_api, query, limit=30, use_mock=True, filters_key=()):
+    """Fetch active and sold items concurrently, each through cached_fetch_items.
+
+    Returns ((active_items, active_fields, active_error), (sold_items, sold_fields, sold_error)).
+    """
+    ctx = get_script_run_ctx()
+    active = _fetch_executor.submit(
+        _with_script_context, ctx, cached_fetch_items, _api, query,
+        sold=False, limit=limit, use_mock=use_mock, filters_key=filters_key
+    )
+    sold = _fetch_executor.submit(
+        _with_script_context, ctx, cached_fetch_items, _api, query,
+        sold=True, limit=limit, use_mock=use_mock, filters_key=filters_key
+    )
+    return active.result(), sold.result()
+
+def freeze_filters(filters):
+    """Return filter settings as a sorted tuple of pairs usable as a cache key."""
+    return tuple(sorted(filters.items())) if filters else ()
+
+@st.cache_resource
+def get_ebay_api():
+    """Return the EbayAPI shared by all sessions (credentials, pool and token are app-wide)."""
+    return EbayAPI()
 
 class EbayAPI:
     def __init__(self):
@@ -13,6 +206,10 @@ class EbayAPI:
         self.cert_id = os.getenv("EBAY_CERT_ID")
         self.dev_id = os.getenv("EBAY_DEV_ID")
         self.use_mock = True  # Toggle for using mock data
+        self.session = get_http_session()  # Pooled keep-alive connections for every eBay call
+        self._token = None
+        self._token_expiry = 0
+        self._token_headers = self._build_token_headers()
         
     def set_credentials(self, app_id=None, cert_id=None, dev_id=None):
         """Set eBay credentials programmatically."""
@@ -22,6 +219,18 @@ class EbayAPI:
             self.cert_id = cert_id
         if dev_id is not None:
             self.dev_id = dev_id
+        # A token issued for other credentials must not be reused
+        self._token = None
+        self._token_expiry = 0
+        self._token_headers = self._build_token_headers()
+    
+    def _build_token_headers(self):
+        """Build the token request headers; the Basic auth value only changes with the credentials."""
+        encoded_auth = base64.b64encode(f"{self.app_id}:{self.cert_id}".encode()).decode()
+        return {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Authorization": f"Basic {encoded_auth}"
+        }
 
     def get_credentials_status(self):
         """Return a dict with credential status and details (masked)."""
@@ -45,63 +254,110 @@ class EbayAPI:
             self.dev_id is not None and self.dev_id != ""
         ])
 
-    def validate_credentials(self):
-        """Try a real API call to validate credentials (if not in mock mode)."""
-        if self.use_mock:
+    def validate_credentials(self, use_mock=None):
+        """Try a real API call to validate credentials (if not in mock mode).
+
+        use_mock overrides the instance's mock mode for this call.
+        """
+        if use_mock is None:
+            use_mock = self.use_mock
+        if use_mock:
             return True, "Mock mode: credentials assumed valid."
         if not self.check_credentials():
             return False, "Missing one or more credentials."
         # Try to get a token
-        token, error = self.get_oauth_token()
+        token, error = self.get_oauth_token(use_mock=False)
         if token:
             return True, "Successfully obtained OAuth token."
         return False, error
         
-    def get_oauth_token(self):
-        """Get OAuth token for eBay API"""
-        if self.use_mock:
+    def get_oauth_token(self, force_refresh=False, use_mock=None):
+        """Get OAuth token for eBay API, reusing the cached one until it nears expiry
+
+        use_mock overrides the instance's mock mode for this call; the shared
+        instance keeps its default, so callers pass the session's toggle.
+        """
+        if use_mock is None:
+            use_mock = self.use_mock
+        if use_mock:
             return "mock-token", None
             
         if not self.check_credentials():
             return None, "Missing eBay credentials"
+        
+        if not force_refresh:
+            if not self._token:
+                self._load_disk_token()
+            if self._token and time.time() < self._token_expiry:
+                return self._token, None
             
         try:
-            auth_string = f"{self.app_id}:{self.cert_id}"
-            encoded_auth = base64.b64encode(auth_string.encode()).decode()
-            
-            headers = {
-                "Content-Type": "application/x-www-form-urlencoded",
-                "Authorization": f"Basic {encoded_auth}"
-            }
-            
-            data = {
-                "grant_type": "client_credentials",
-                "scope": "https://api.ebay.com/oauth/api_scope"
-            }
-            
-            response = requests.post(
-                "https://api.ebay.com/identity/v1/oauth2/token",
-                headers=headers,
-                data=data,
-                timeout=15
+            response = self.session.post(
+                OAUTH_TOKEN_URL,
+                headers=self._token_headers,
+                data=OAUTH_TOKEN_BODY,
+                timeout=API_TIMEOUT
             )
             
             if response.status_code == 200:
-                token_data = response.json()
-                return token_data["access_token"], None
+                token_data = orjson.loads(response.content)
+                self._token = token_data["access_token"]
+                self._token_expiry = time.time() + token_data.get("expires_in", 7200) - TOKEN_EXPIRY_MARGIN
+                self._save_disk_token()
+                return self._token, None
             else:
                 return None, f"Failed to get token: {response.status_code}"
                 
-        except Exception as e:
+        except (requests.RequestException, KeyError, ValueError) as e:
             return None, f"Error: {str(e)}"
     
+    def _load_disk_token(self):
+        """Adopt a still-valid token saved by an earlier process for the same app id."""
+        try:
+            cached = orjson.loads(TOKEN_CACHE_FILE.read_bytes())
+        except (OSError, ValueError):
+            return
+        # Anything but the expected shape is a cache miss, never an error for the caller
+        if not isinstance(cached, dict):
+            return
+        token, expiry = cached.get("token"), cached.get("expiry")
+        if not isinstance(token, str) or not isinstance(expiry, (int, float)) or isinstance(expiry, bool):
+            return
+        if cached.get("app_id") == self.app_id and time.time() < expiry:
+            self._token = token
+            self._token_expiry = expiry
+
+    def _save_disk_token(self):
+        """Persist the current token so restarted workers can skip the OAuth round-trip."""
+        tmp_name = None
+        try:
+            TOKEN_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            # A uniquely named temp file, created owner-only (0o600), so workers saving at the
+            # same time cannot clobber each other and the bearer token is not world-readable
+            with tempfile.NamedTemporaryFile(
+                dir=TOKEN_CACHE_FILE.parent, prefix=f"{TOKEN_CACHE_FILE.stem}.", suffix=".tmp", delete=False
+            ) as tmp_file:
+                tmp_name = tmp_file.name
+                tmp_file.write(orjson.dumps({
+                    "app_id": self.app_id,
+                    "token": self._token,
+                    "expiry": self._token_expiry
+                }))
+            os.replace(tmp_name, TOKEN_CACHE_FILE)
+        except OSError as e:
+            print(f"Error saving eBay token: {e}")
+            if tmp_name:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+
     def set_mock_mode(self, use_mock: bool):
         """Enable or disable mock mode."""
         self.use_mock = use_mock
 
-    def fetch_sold_items_finding(self, query, limit=30):
+    def fetch_sold_items_finding(self, query, limit=30, filters=None):
         """Fetch sold items using the eBay Finding API (findCompletedItems)."""
-        endpoint = "https://svcs.ebay.com/services/search/FindingService/v1"
         params = {
             "OPERATION-NAME": "findCompletedItems",
             "SERVICE-VERSION": "1.13.0",
@@ -109,18 +365,18 @@ class EbayAPI:
             "RESPONSE-DATA-FORMAT": "JSON",
             "keywords": query,
             "paginationInput.entriesPerPage": limit,
-            "outputSelector": "SellerInfo"
+            **_finding_item_filters(filters)
         }
-        response = requests.get(endpoint, params=params, timeout=15)
+        response = self.session.get(FINDING_API_URL, params=params, timeout=API_TIMEOUT)
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             items = []
             for item in data["findCompletedItemsResponse"][0]["searchResult"][0].get("item", []):
                 items.append({
                     "id": item.get("itemId", [""])[0],
                     "title": item.get("title", [""])[0],
                     "url": item.get("viewItemURL", [""])[0],
-                    "image": item.get("galleryURL", ["https://via.placeholder.com/150"])[0],
+                    "image": item.get("galleryURL", [PLACEHOLDER_IMAGE])[0],
                     "price": float(item.get("sellingStatus", [{}])[0].get("currentPrice", [{}])[0].get("__value__", 0)),
                     "shipping": float(item.get("shippingInfo", [{}])[0].get("shippingServiceCost", [{}])[0].get("__value__", 0)),
                     "end_time": item.get("listingInfo", [{}])[0].get("endTime", ""),
@@ -129,20 +385,25 @@ class EbayAPI:
                 })
             return items, None
         else:
-            return [], f"eBay Finding API error: {response.status_code} {response.text}"
+            return [], f"eBay Finding API error: {response.status_code} {response.text[:MAX_ERROR_BODY]}"
+
+    def fetch_items(self, query, sold=False, filters=None, limit=30, use_mock=None):
+        """Fetch items from eBay API (real or mock).
 
-    def fetch_items(self, query, sold=False, filters=None, limit=30):
-        """Fetch items from eBay API (real or mock)."""
-        if self.use_mock:
-            return self._generate_mock_items(limit, sold), None
+        use_mock overrides the instance's mock mode for this call.
+        """
+        if use_mock is None:
+            use_mock = self.use_mock
+        if use_mock:
+            return self._generate_mock_items(limit, sold, query, filters), None
 
         if not self.check_credentials():
             return [], "Missing eBay credentials."
 
         if sold:
-            return self.fetch_sold_items_finding(query, limit=limit)
+            return self.fetch_sold_items_finding(query, limit=limit, filters=filters)
         else:
-            token, error = self.get_oauth_token()
+            token, error = self.get_oauth_token(use_mock=False)
             if not token:
                 return [], f"OAuth error: {error}"
             try:
@@ -150,80 +411,64 @@ class EbayAPI:
                     "Authorization": f"Bearer {token}",
                     "Content-Type": "application/json",
                 }
-                endpoint = "https://api.ebay.com/buy/browse/v1/item_summary/search"
                 params = {
                     "q": query,
-                    "filter": "soldStatus:{ACTIVE}",
+                    "filter": _browse_filter(filters),
                     "limit": limit
                 }
-                response = requests.get(endpoint, headers=headers, params=params, timeout=15)
+                response = self.session.get(BROWSE_SEARCH_URL, headers=headers, params=params, timeout=API_TIMEOUT)
                 if response.status_code == 200:
-                    data = response.json()
-                    items = []
-                    for item in data.get("itemSummaries", []):
-                        items.append({
-                            "id": item.get("itemId"),
-                            "title": item.get("title"),
-                            "url": item.get("itemWebUrl"),
-                            "image": item.get("image", {}).get("imageUrl", "https://via.placeholder.com/150"),
-                            "price": float(item.get("price", {}).get("value", 0)),
-                            "shipping": float(item.get("shippingOptions", [{}])[0].get("shippingCost", {}).get("value", 0)),
-                            "end_time": item.get("itemEndDate", ""),
-                            "watchers": item.get("watchCount", 0),
-                            "condition": item.get("condition", {}).get("conditionDisplayName", "N/A"),
-                            "sold": False
-                        })
-                    return items, None
+                    data = orjson.loads(response.content)
+                    return [_parse_browse_item(item) for item in data.get("itemSummaries", [])], None
                 else:
-                    return [], f"eBay API error: {response.status_code} {response.text}"
-            except Exception as e:
-                return self._generate_mock_items(limit, False), f"Exception: {str(e)} (using mock data)"
+                    return [], f"eBay API error: {response.status_code} {response.text[:MAX_ERROR_BODY]}"
+            except (requests.RequestException, ValueError, TypeError, KeyError, AttributeError, IndexError) as e:
+                return self._generate_mock_items(limit, False, query, filters), f"Exception: {str(e)} (using mock data)"
     
-    def _generate_mock_items(self, count, sold=False):
-        """Generate mock item data for testing"""
-        import random
-        from datetime import datetime, timedelta
+    def _generate_mock_items(self, count, sold=False, query="", filters=None):
+        """Generate mock item data for testing, the same for a given query on every call"""
+        # Seed from the query so cached and uncached mock results agree
+        rng = np.random.default_rng(zlib.crc32(f"{query}|{sold}".encode()))
         
-        items = []
-        conditions = ["New", "Used", "Like New", "For parts or not working"]
+        # Apply the price and condition filters at the source by drawing only matching values
+        low, high = 10, 100
+        conditions = MOCK_CONDITIONS
+        if filters:
+            low = max(low, filters.get("min_price", low))
+            high = min(high, filters.get("max_price", high))
+            conditions = MOCK_CONDITION_GROUPS.get(filters.get("condition"), MOCK_CONDITIONS)
+        if low > high:
+            return []
         
-        for i in range(count):
-            if sold:
-                days_ago = random.randint(1, 30)
-                end_time = (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
-            else:
-                days_future = random.randint(1, 7)
-                end_time = (datetime.now() + timedelta(days=days_future)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
-            
-            price = round(random.uniform(10, 100), 2)
-            shipping = round(random.uniform(0, 15), 2)
-            
-            item = {
-                "id": f"mock-{i}-{random.randint(10000, 99999)}",
+        # Draw every column at once, then zip them into item dicts
+        days = rng.integers(1, 31 if sold else 8, count).astype("timedelta64[D]")
+        now = np.datetime64(datetime.now(), "s")
+        end_times = np.datetime_as_string(now - days if sold else now + days)
+        prices = np.round(rng.uniform(low, high, count), 2)
+        shipping = np.round(rng.uniform(0, 15, count), 2)
+        watchers = rng.integers(0, 21, count)
+        conditions = np.array(conditions)[rng.integers(0, len(conditions), count)]
+        suffixes = rng.integers(10000, 100000, count)
+        
+        return [
+            {
+                "id": f"mock-{i}-{suffix}",
                 "title": f"Mock Item {i+1} - Demo Product",
                 "url": "https://www.ebay.com",
-                "image": "https://via.placeholder.com/150",
+                "image": PLACEHOLDER_IMAGE,
                 "price": price,
-                "shipping": shipping,
-                "end_time": end_time,
-                "watchers": random.randint(0, 20),
-                "condition": random.choice(conditions),
+                "shipping": ship,
+                "end_time": f"{end_time}.000Z",
+                "watchers": watcher_count,
+                "condition": condition,
                 "sold": sold
             }
-            
-            items.append(item)
-        
-        return items
+            for i, (suffix, price, ship, end_time, watcher_count, condition) in enumerate(zip(
+                suffixes.tolist(), prices.tolist(), shipping.tolist(),
+                end_times.tolist(), watchers.tolist(), conditions.tolist()
+            ))
+        ]
     
     def get_fee_rate(self, category):
         """Get eBay fee rate for a category"""
-        fee_rates = {
-            "Electronics": 0.12,
-            "Clothing": 0.13,
-            "Collectibles": 0.125,
-            "Home & Garden": 0.12,
-            "Toys": 0.125,
-            "Books": 0.145,
-            "Other": 0.13
-        }
-        return fee_rates.get(category, 0.13)
\ No newline at end of file
+        return FEE_RATES.get(category, DEFAULT_FEE_RATE)
\ No newline at end of file
@@ -1,21 +1,23 @@
 import streamlit as st
+from collections import deque
 from pathlib import Path
 import os
+import traceback
 from dotenv import load_dotenv
 
 # Import local modules
-from src.api.ebay_api import EbayAPI
+from src.api.ebay_api import get_ebay_api, cached_fetch_active_and_sold, freeze_filters
 from src.ui.header import display_header
 from src.ui.sidebar import display_sidebar
-from src.ui.search import display_search_form, show_recent_searches
+from src.ui.search import display_search_form, show_recent_searches, MAX_RECENT_SEARCHES
 from src.ui.results import display_items, display_metrics
 from src.ui.calculator import display_profit_calculator
 from src.ui.analytics import display_analytics
 from src.ui.guide import display_quick_start_guide, display_marketplace_comparison
 from src.data.storage import load_flips, save_flip, load_recent_searches, save_recent_searches
-from src.utils.stats import calculate_stats
+from src.utils.stats import calculate_market_summary
 from src.utils.charts import generate_price_chart, generate_volume_chart
-from src.utils.logging import log_debug
+from src.utils.logging import log_debug, MAX_DEBUG_MESSAGES, DEBUG
 
 # Load environment variables
 load_dotenv()
@@ -24,7 +26,6 @@ load_dotenv()
 DATA_DIR = Path("data")
 FLIPS_FILE = DATA_DIR / "flips.csv"
 SEARCHES_FILE = DATA_DIR / "searches.json"
-MAX_RECENT_SEARCHES = 10
 
 # Initialize session state
 if "filter_settings" not in st.session_state:
@@ -42,17 +43,15 @@ if "active_items" not in st.session_state:
 if "sold_items" not in st.session_state:
     st.session_state.sold_items = []
 if "recent_searches" not in st.session_state:
-    st.session_state.recent_searches = []
+    st.session_state.recent_searches = deque(maxlen=MAX_RECENT_SEARCHES)
+if "recent_query_set" not in st.session_state:
+    st.session_state.recent_query_set = set()
 if "camera_photo" not in st.session_state:
     st.session_state.camera_photo = None
 if "debug_info" not in st.session_state:
-    st.session_state.debug_info = []
+    st.session_state.debug_info = deque(maxlen=MAX_DEBUG_MESSAGES)
 if "use_mock" not in st.session_state:
     st.session_state.use_mock = True
-if "ebay_api" not in st.session_state:
-    from src.api.ebay_api import EbayAPI
-    st.session_state.ebay_api = EbayAPI()
-    st.session_state.ebay_api.set_mock_mode(st.session_state.use_mock)
 
 # Set page config
 st.set_page_config(
@@ -67,8 +66,8 @@ def test_ebay_connection():
         log_debug("Testing eBay API connection")
         
         # Get OAuth token
-        api = st.session_state.ebay_api
-        token, error = api.get_oauth_token(force_refresh=True)
+        api = get_ebay_api()
+        token, error = api.get_oauth_token(force_refresh=True, use_mock=st.session_state.use_mock)
         
         if token:
             log_debug("Successfully acquired OAuth token")
@@ -81,7 +80,8 @@ def test_ebay_connection():
     except Exception as e:
         error_msg = f"Error testing eBay connection: {str(e)}"
         log_debug(error_msg)
-        log_debug(traceback.format_exc())
+        if DEBUG:
+            log_debug(traceback.format_exc())
         return False, error_msg
     
 def main():
@@ -96,16 +96,16 @@ def main():
         
         # 3) Show the search form
         did_search = display_search_form()
+        search = st.session_state.last_search
         
         # Show marketplace information if no search
-        if not did_search and not st.session_state.last_search:
+        if not did_search and not search:
             st.info("🔍 Enter a search above to begin")
             display_marketplace_comparison()
             display_quick_start_guide()
             return
 
         # 4) Get search parameters
-        search = st.session_state.last_search
         query = search["query"]
         is_upc = search.get("is_upc", False)
         flip_type = search.get("flip_type", "Retail Arbitrage")
@@ -120,9 +120,12 @@ def main():
 
         # 5) Fetch data
         with st.spinner("Fetching data..."):
-            ebay_api = st.session_state.ebay_api
-            active_items, active_error = ebay_api.fetch_items(query, sold=False, filters=filters)
-            sold_items, sold_error = ebay_api.fetch_items(query, sold=True, filters=filters)
+            ebay_api = get_ebay_api()
+            use_mock = st.session_state.use_mock
+            filters_key = freeze_filters(filters)
+            (active_items, active_fields, active_error), (sold_items, sold_fields, sold_error) = cached_fetch_active_and_sold(
+                ebay_api, query, use_mock=use_mock, filters_key=filters_key
+            )
             
             st.session_state.active_items = active_items
             st.session_state.sold_items = sold_items
@@ -132,30 +135,30 @@ def main():
             if sold_error:
                 st.warning(f"Notice for sold items: {sold_error}")
 
-        # 6) Compute statistics
-        active_stats = calculate_stats(active_items)
-        sold_stats = calculate_stats(sold_items)
+        # 6) Compute statistics from the columnar fields cached with each fetch
+        active_stats, sold_stats, market = calculate_market_summary(active_fields, sold_fields)
 
         # 7) Display metrics and charts
-        display_metrics(active_stats, sold_stats, ebay_api.get_fee_rate(category))
+        fee_rate = ebay_api.get_fee_rate(category)
+        display_metrics(active_stats, sold_stats, market, fee_rate)
         
         # 8) Show price distribution chart
-        price_fig = generate_price_chart(active_items, sold_items)
+        price_fig = generate_price_chart(active_fields["price"], sold_fields["price"])
         if price_fig:
             st.plotly_chart(price_fig, use_container_width=True)
 
         # 9) Show volume chart
-        volume_fig = generate_volume_chart(active_items, sold_items)
+        volume_fig = generate_volume_chart(active_fields["end_time"], sold_fields["end_time"])
         if volume_fig:
             st.plotly_chart(volume_fig, use_container_width=True)
 
         # 10) Display item listings
         st.markdown("### eBay Results")
-        display_items(active_items, "Active eBay Listings", sort_options=True, pagination=True, page_size=10)
-        display_items(sold_items, "Sold eBay Items (30d)", sort_options=True, pagination=True, page_size=10)
+        display_items(active_items, active_fields, "Active eBay Listings", sort_options=True, pagination=True, page_size=10)
+        display_items(sold_items, sold_fields, "Sold eBay Items (30d)", sort_options=True, pagination=True, page_size=10)
 
         # 11) Show profit calculator
-        display_profit_calculator(active_stats, sold_stats, cost, category, flip_type)
+        display_profit_calculator(active_stats, sold_stats, cost, category, flip_type, fee_rate)
 
         # 12) Display analytics
         df = load_flips()
@@ -1,5 +1,11 @@
+import streamlit as st
 import pandas as pd
-import json
+import atexit
+import csv
+import io
+import os
+import threading
+import orjson
 from pathlib import Path
 from datetime import datetime
 
@@ -7,43 +13,87 @@ from datetime import datetime
 DATA_DIR = Path("data")
 FLIPS_FILE = DATA_DIR / "flips.csv"
 SEARCHES_FILE = DATA_DIR / "searches.json"
+FLIP_COLUMNS = [
+    "date", "query", "category", "flip_type", "cost", "selling_price",
+    "shipping_cost", "additional_costs", "ebay_fee", "paypal_fee", "profit", "roi"
+]
+# Money and ROI columns stay float64 so saved values like 0.1 export and sum exactly as entered
+FLIP_NUMERIC_COLUMNS = [
+    "cost", "selling_price", "shipping_cost", "additional_costs",
+    "ebay_fee", "paypal_fee", "profit", "roi"
+]
+FLIP_CATEGORY_DTYPES = {"category": "category", "flip_type": "category"}
+
+# Recent searches are written off the script thread, at most once per delay window
+SEARCHES_SAVE_DELAY = 5.0
+_pending_lock = threading.Lock()
+_pending_searches = None
 
 def ensure_data_dir():
     """Ensure data directory exists"""
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+def empty_flips():
+    """Return a flips DataFrame with no rows but the same columns and dtypes as a loaded one"""
+    columns = {col: pd.Series(dtype="object") for col in FLIP_COLUMNS}
+    columns["date"] = pd.Series(dtype="datetime64[ns]")
+    for col in FLIP_NUMERIC_COLUMNS:
+        columns[col] = pd.Series(dtype="float64")
+    for col, dtype in FLIP_CATEGORY_DTYPES.items():
+        columns[col] = pd.Series(dtype=dtype)
+    return pd.DataFrame(columns)
+
+@st.cache_data(show_spinner=False)
+def _load_flips_cached(path, mtime, size):
+    """Parse the flips CSV; mtime and size key the cache so edits trigger a re-read"""
+    try:
+        df = pd.read_csv(path, engine="c", dtype=FLIP_CATEGORY_DTYPES)
+        # Coerce all numeric columns in one pass so a stray bad cell becomes NaN
+        numeric = [col for col in FLIP_NUMERIC_COLUMNS if col in df]
+        df[numeric] = df[numeric].apply(pd.to_numeric, errors="coerce").astype("float64")
+        if "date" in df:
+            # Like the numeric columns, a malformed date becomes NaT instead of failing the load
+            df["date"] = pd.to_datetime(df["date"], errors="coerce")
+        return df
+    except Exception as e:
+        print(f"Error loading flips: {e}")
+        return empty_flips()
+
 def load_flips():
     """Load saved flips from CSV file"""
     ensure_data_dir()
     
     if FLIPS_FILE.exists():
-        try:
-            return pd.read_csv(FLIPS_FILE)
-        except Exception as e:
-            print(f"Error loading flips: {e}")
-            return pd.DataFrame()
+        stat = FLIPS_FILE.stat()
+        return _load_flips_cached(str(FLIPS_FILE), stat.st_mtime, stat.st_size)
     else:
-        return pd.DataFrame()
+        return empty_flips()
 
 def save_flip(flip_data):
-    """Save a new flip to CSV file"""
+    """Append a new flip to CSV file"""
     ensure_data_dir()
     
     # Add date if not present
     if "date" not in flip_data or not flip_data["date"]:
         flip_data["date"] = datetime.now().strftime("%Y-%m-%d")
     
-    # Convert to DataFrame
-    new_flip = pd.DataFrame([flip_data])
-    
-    # Load existing data
-    df = load_flips()
-    
-    # Append new flip
-    df = pd.concat([df, new_flip], ignore_index=True)
+    # Append a single row instead of reading and rewriting the whole file.
+    # a+ lets us read back the header while writes still land at the end.
+    with FLIPS_FILE.open("a+", newline="", buffering=65536) as f:
+        write_header = f.tell() == 0
+        if write_header:
+            fieldnames = FLIP_COLUMNS + [key for key in flip_data if key not in FLIP_COLUMNS]
+        else:
+            # Reuse the existing header so new rows line up with older files
+            f.seek(0)
+            fieldnames = next(csv.reader(f), FLIP_COLUMNS)
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        if write_header:
+            writer.writeheader()
+        writer.writerow(flip_data)
     
-    # Save to CSV
-    df.to_csv(FLIPS_FILE, index=False)
+    # Drop the cached frame so the next load sees the new row
+    _load_flips_cached.clear()
 
 def load_recent_searches():
     """Load recent searches from JSON file"""
@@ -51,31 +101,72 @@ def load_recent_searches():
     
     if SEARCHES_FILE.exists():
         try:
-            with open(SEARCHES_FILE, "r") as f:
-                return json.load(f)
+            return orjson.loads(SEARCHES_FILE.read_bytes())
         except Exception as e:
             print(f"Error loading recent searches: {e}")
             return []
     else:
         return []
 
-def save_recent_searches(searches):
-    """Save recent searches to JSON file"""
-    ensure_data_dir()
-    
+def _write_recent_searches(searches):
+    """Write searches to a temp file and swap it in so readers never see a partial file"""
     try:
-        with open(SEARCHES_FILE, "w") as f:
-            json.dump(searches, f)
+        tmp_file = SEARCHES_FILE.with_suffix(".tmp")
+        tmp_file.write_bytes(orjson.dumps(searches))
+        os.replace(tmp_file, SEARCHES_FILE)
     except Exception as e:
         print(f"Error saving recent searches: {e}")
 
-def export_flips():
-    """Export flips to Excel file"""
+def _flush_pending_searches():
+    """Write the newest pending snapshot, if any"""
+    global _pending_searches
+    with _pending_lock:
+        searches, _pending_searches = _pending_searches, None
+    if searches is not None:
+        _write_recent_searches(searches)
+
+# Write any snapshot still waiting on its timer when the process exits
+atexit.register(_flush_pending_searches)
+
+def save_recent_searches(searches):
+    """Save recent searches to JSON file in the background"""
+    global _pending_searches
+    ensure_data_dir()
+    
+    # Only the newest snapshot is kept; the timer started by the first change writes it.
+    # The timer is a daemon so shutdown does not wait on it; the atexit hook flushes instead.
+    with _pending_lock:
+        already_queued = _pending_searches is not None
+        _pending_searches = list(searches)
+    if not already_queued:
+        timer = threading.Timer(SEARCHES_SAVE_DELAY, _flush_pending_searches)
+        timer.daemon = True
+        timer.start()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _flips_excel_bytes(path, mtime, size):
+    """Render the flips sheet as xlsx bytes; keyed like the flips cache so it is built once per file version"""
+    buffer = io.BytesIO()
+    # xlsxwriter keeps far less per-cell state than openpyxl. Its constant_memory mode is left off:
+    # pandas writes column by column, and that mode drops cells above the current row.
+    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+        load_flips().to_excel(writer, index=False, sheet_name="Flips")
+    return buffer.getvalue()
+
+def export_flips_bytes():
+    """Return the saved flips as xlsx bytes, or None if there are none"""
     ensure_data_dir()
     
-    df = load_flips()
-    if not df.empty:
+    if not FLIPS_FILE.exists() or load_flips().empty:
+        return None
+    stat = FLIPS_FILE.stat()
+    return _flips_excel_bytes(str(FLIPS_FILE), stat.st_mtime, stat.st_size)
+
+def export_flips():
+    """Export flips to Excel file"""
+    data = export_flips_bytes()
+    if data is not None:
         export_file = DATA_DIR / f"flips_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        df.to_excel(export_file, index=False)
+        export_file.write_bytes(data)
         return export_file
-    return None 
\ No newline at end of file
+    return None
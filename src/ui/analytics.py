@@ -1,85 +1,134 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import hashlib
+import orjson
+import numpy as np
 from datetime import datetime, timedelta
+from src.utils.charts import downsample
+
+# Sample data for the platform comparison tab; static, so built once at import
+PLATFORM_DF = pd.DataFrame({
+    "Platform": ["eBay", "Facebook Marketplace", "Craigslist"],
+    "Average Fee": [0.13, 0.0, 0.0],
+    "Average Shipping": [5.0, 0.0, 0.0],
+    "Average Time to Sell": [7, 3, 5]
+})
+
+def _df_hash(df):
+    """Fingerprint a DataFrame from pandas' vectorized per-row hashes"""
+    row_hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    return hashlib.blake2b(row_hashes.tobytes(), digest_size=16).hexdigest()
+
+@st.cache_data(hash_funcs={pd.DataFrame: _df_hash}, max_entries=8, show_spinner=False)
+def _analytics_figures(df):
+    """Build the data-driven analytics figures, as JSON"""
+    # Imported here so reruns that draw no analytics skip loading plotly
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
+    figures = {}
+    
+    # Profit over time: sort by day once, then sum each day's run of rows
+    days = df["date"].to_numpy("datetime64[D]")
+    profit = np.nan_to_num(df["profit"].to_numpy(np.float64))
+    dated = ~np.isnat(days)
+    days, profit = days[dated], profit[dated]
+    order = np.argsort(days, kind="stable")
+    days, profit = days[order], profit[order]
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if days.size else np.empty(0, dtype=np.intp)
+    daily_profit = np.add.reduceat(profit, starts) if starts.size else profit
+    daily = downsample(pd.DataFrame({"date": days[starts], "profit": daily_profit}), "date", "profit")
+    figures["profit"] = px.line(
+        x=daily["date"],
+        y=daily["profit"],
+        title="Profit Over Time",
+        labels={"x": "Date", "y": "Profit ($)"}
+    ).to_json()
+    
+    # ROI distribution, binned here so only the 20 bar heights reach the browser
+    roi = df["roi"].to_numpy(np.float64)
+    counts, edges = np.histogram(roi[~np.isnan(roi)], bins=20)
+    fig = px.bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        title="ROI Distribution",
+        labels={"x": "ROI (%)", "y": "count"}
+    )
+    fig.update_traces(width=np.diff(edges))
+    figures["roi"] = fig.to_json()
+    
+    # Encode categories once and aggregate both category charts with bincount
+    codes, categories = pd.factorize(df["category"], sort=True)
+    valid = codes >= 0
+    codes = codes[valid]
+    profit = df["profit"].to_numpy(np.float64)[valid]
+    roi = df["roi"].to_numpy(np.float64)[valid]
+    has_roi = ~np.isnan(roi)
+    profit_sums = np.bincount(codes, weights=np.nan_to_num(profit), minlength=len(categories))
+    roi_sums = np.bincount(codes[has_roi], weights=roi[has_roi], minlength=len(categories))
+    roi_counts = np.bincount(codes[has_roi], minlength=len(categories))
+    
+    # Category charts go straight to go.Bar; px would build a DataFrame and run its figure factory
+    figures["category_profit"] = go.Figure(
+        go.Bar(x=categories, y=profit_sums),
+        layout={
+            "title": {"text": "Total Profit by Category"},
+            "xaxis": {"title": {"text": "Category"}},
+            "yaxis": {"title": {"text": "Total Profit ($)"}}
+        }
+    ).to_json()
+    
+    category_roi = np.divide(roi_sums, roi_counts, out=np.full(len(categories), np.nan), where=roi_counts > 0)
+    figures["category_roi"] = go.Figure(
+        go.Bar(x=categories, y=category_roi),
+        layout={
+            "title": {"text": "Average ROI by Category"},
+            "xaxis": {"title": {"text": "Category"}},
+            "yaxis": {"title": {"text": "Average ROI (%)"}}
+        }
+    ).to_json()
+    
+    return figures
 
 def display_analytics(df):
     """Display analytics charts and insights"""
     st.markdown("### 📈 Analytics")
     
-    # Convert date column to datetime
-    df["date"] = pd.to_datetime(df["date"])
+    # Reuse this session's parsed figures until the flips data itself changes
+    data_key = _df_hash(df)
+    if st.session_state.get("analytics_key") != data_key:
+        st.session_state.analytics_figures = {
+            name: orjson.loads(figure_json) for name, figure_json in _analytics_figures(df).items()
+        }
+        st.session_state.analytics_key = data_key
+    figures = st.session_state.analytics_figures
     
     # Create tabs for different analytics views
     tab1, tab2, tab3 = st.tabs(["Profit Analysis", "Category Analysis", "Platform Comparison"])
     
     with tab1:
-        # Profit over time
         st.markdown("#### Profit Over Time")
-        fig = px.line(
-            df,
-            x="date",
-            y="profit",
-            title="Profit Over Time",
-            labels={"date": "Date", "profit": "Profit ($)"}
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figures["profit"], use_container_width=True)
         
-        # ROI distribution
         st.markdown("#### ROI Distribution")
-        fig = px.histogram(
-            df,
-            x="roi",
-            title="ROI Distribution",
-            labels={"roi": "ROI (%)"},
-            nbins=20
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figures["roi"], use_container_width=True)
     
     with tab2:
-        # Profit by category
         st.markdown("#### Profit by Category")
-        category_profit = df.groupby("category")["profit"].sum().reset_index()
-        fig = px.bar(
-            category_profit,
-            x="category",
-            y="profit",
-            title="Total Profit by Category",
-            labels={"category": "Category", "profit": "Total Profit ($)"}
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figures["category_profit"], use_container_width=True)
         
-        # ROI by category
         st.markdown("#### ROI by Category")
-        category_roi = df.groupby("category")["roi"].mean().reset_index()
-        fig = px.bar(
-            category_roi,
-            x="category",
-            y="roi",
-            title="Average ROI by Category",
-            labels={"category": "Category", "roi": "Average ROI (%)"}
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figures["category_roi"], use_container_width=True)
     
     with tab3:
+        import plotly.express as px
+        
         # Platform comparison
         st.markdown("#### Platform Comparison")
         
-        # Create sample data for platform comparison
-        platforms = ["eBay", "Facebook Marketplace", "Craigslist"]
-        platform_data = {
-            "Platform": platforms,
-            "Average Fee": [0.13, 0.0, 0.0],
-            "Average Shipping": [5.0, 0.0, 0.0],
-            "Average Time to Sell": [7, 3, 5]
-        }
-        
-        platform_df = pd.DataFrame(platform_data)
-        
         # Fee comparison
         fig = px.bar(
-            platform_df,
+            PLATFORM_DF,
             x="Platform",
             y="Average Fee",
             title="Platform Fee Comparison",
@@ -89,7 +138,7 @@ def display_analytics(df):
         
         # Time to sell comparison
         fig = px.bar(
-            platform_df,
+            PLATFORM_DF,
             x="Platform",
             y="Average Time to Sell",
             title="Average Time to Sell",
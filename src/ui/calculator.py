@@ -1,8 +1,25 @@
 import streamlit as st
 from src.data.storage import save_flip
 
-def display_profit_calculator(active_stats, sold_stats, cost, category, flip_type):
-    """Display profit calculator with ROI analysis"""
+# PayPal charges a percentage plus a fixed fee per transaction
+PAYPAL_FEE_RATE = 0.029
+PAYPAL_FIXED_FEE = 0.30
+
+# Cost breakdown rendered as one markdown block; only the amounts change per rerun
+COST_BREAKDOWN_TEMPLATE = """**Item Cost:** ${cost:.2f}
+
+**Shipping:** ${shipping_cost:.2f}
+
+**Additional:** ${additional_costs:.2f}
+
+**eBay Fee:** ${ebay_fee:.2f}
+
+**PayPal Fee:** ${paypal_fee:.2f}
+
+**Total Costs:** ${total_costs:.2f}"""
+
+def display_profit_calculator(active_stats, sold_stats, cost, category, flip_type, fee_rate):
+    """Display profit calculator with ROI analysis; fee_rate is the eBay rate for the category"""
     st.markdown("### 💰 Profit Calculator")
     
     # Create two columns for inputs and results
@@ -53,8 +70,8 @@ def display_profit_calculator(active_stats, sold_stats, cost, category, flip_typ
         st.markdown("#### Results")
         
         # Calculate fees
-        ebay_fee = selling_price * 0.13  # 13% fee rate
-        paypal_fee = selling_price * 0.029 + 0.30  # 2.9% + $0.30
+        ebay_fee = selling_price * fee_rate
+        paypal_fee = selling_price * PAYPAL_FEE_RATE + PAYPAL_FIXED_FEE
         
         # Calculate total costs
         total_costs = cost + shipping_cost + additional_costs + ebay_fee + paypal_fee
@@ -68,18 +85,21 @@ def display_profit_calculator(active_stats, sold_stats, cost, category, flip_typ
         st.metric("ROI", f"{roi:.1f}%")
         
         st.markdown("#### Cost Breakdown")
-        st.markdown(f"**Item Cost:** ${cost:.2f}")
-        st.markdown(f"**Shipping:** ${shipping_cost:.2f}")
-        st.markdown(f"**Additional:** ${additional_costs:.2f}")
-        st.markdown(f"**eBay Fee:** ${ebay_fee:.2f}")
-        st.markdown(f"**PayPal Fee:** ${paypal_fee:.2f}")
-        st.markdown(f"**Total Costs:** ${total_costs:.2f}")
+        st.markdown(COST_BREAKDOWN_TEMPLATE.format(
+            cost=cost,
+            shipping_cost=shipping_cost,
+            additional_costs=additional_costs,
+            ebay_fee=ebay_fee,
+            paypal_fee=paypal_fee,
+            total_costs=total_costs
+        ))
     
     # Save flip button
     if st.button("Save Flip", type="primary"):
+        last_search = st.session_state.last_search or {}
         flip_data = {
-            "date": st.session_state.last_search.get("date", ""),
-            "query": st.session_state.last_search.get("query", ""),
+            "date": last_search.get("date", ""),
+            "query": last_search.get("query", ""),
             "category": category,
             "flip_type": flip_type,
             "cost": cost,
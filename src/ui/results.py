@@ -1,63 +1,93 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime
+import html
+import numpy as np
 
-def display_items(items, title, sort_options=True, pagination=True, page_size=10):
-    """Display a list of items with optional sorting and pagination"""
+# HTML for a single listing; a page of these is rendered in one st.markdown call
+CARD_TEMPLATE = """
+<div style="display: flex; gap: 1rem; padding: 0.75rem 0; border-bottom: 1px solid #ddd;">
+<img src="{image}" width="150" style="object-fit: contain;">
+<div>
+<h4><a href="{url}" target="_blank">{title}</a></h4>
+<p><strong>Price:</strong> ${price:.2f}<br>
+{shipping_html}<strong>Condition:</strong> {condition}<br>
+{watchers_html}<strong>Ends:</strong> {end_time}</p>
+</div>
+</div>
+"""
+SHIPPING_HTML = "<strong>Shipping:</strong> ${:.2f}<br>\n"
+FREE_SHIPPING_HTML = "<strong>Shipping:</strong> Free<br>\n"
+WATCHERS_HTML = "<strong>Watchers:</strong> {}<br>\n"
+ITEMS_LIST_HTML = '<div class="items-list">\n{}</div>'
+
+def _page_order(keys, start_idx, end_idx):
+    """Return the indices of keys[start_idx:end_idx] in ascending order; ties keep their fetched order"""
+    # A full stable sort keeps ties in the same order on every page, so no row repeats or goes missing
+    return np.argsort(keys, kind="stable")[start_idx:end_idx]
+
+def display_items(items, fields, title, sort_options=True, pagination=True, page_size=10):
+    """Display a list of items with optional sorting and pagination; fields is the item_arrays view of items"""
     if not items:
         st.info(f"No {title.lower()} found")
         return
     
     st.markdown(f"### {title}")
     
-    # Convert items to DataFrame for easier manipulation
-    df = pd.DataFrame(items)
-    
     # Add sorting options
+    sort_by = None
     if sort_options:
         sort_by = st.selectbox(
             "Sort by",
             ["Price", "Watchers", "End Time"],
             key=f"sort_{title}"
         )
-        
-        if sort_by == "Price":
-            df = df.sort_values("price", ascending=False)
-        elif sort_by == "Watchers":
-            df = df.sort_values("watchers", ascending=False)
-        else:  # End Time
-            df = df.sort_values("end_time", ascending=True)
     
     # Add pagination
+    start_idx, end_idx = 0, len(items)
     if pagination:
-        total_pages = (len(df) + page_size - 1) // page_size
+        total_pages = (len(items) + page_size - 1) // page_size
         page = st.selectbox("Page", range(1, total_pages + 1), key=f"page_{title}")
         start_idx = (page - 1) * page_size
         end_idx = start_idx + page_size
-        df = df.iloc[start_idx:end_idx]
     
-    # Display items
-    for _, item in df.iterrows():
-        with st.container():
-            col1, col2 = st.columns([1, 3])
-            
-            with col1:
-                st.image(item["image"], width=150)
-            
-            with col2:
-                st.markdown(f"#### [{item['title']}]({item['url']})")
-                st.markdown(f"**Price:** ${item['price']:.2f}")
-                st.markdown(f"**Shipping:** ${item['shipping']:.2f}")
-                st.markdown(f"**Condition:** {item['condition']}")
-                st.markdown(f"**Watchers:** {item['watchers']}")
-                
-                # Format end time
-                end_time = datetime.strptime(item["end_time"], "%Y-%m-%dT%H:%M:%S.000Z")
-                st.markdown(f"**Ends:** {end_time.strftime('%Y-%m-%d %H:%M')}")
-            
-            st.markdown("---")
+    # Sort the columnar fields in C and gather the current page's rows by index
+    if sort_by == "Price":
+        page_order = _page_order(-fields["price"], start_idx, end_idx)
+    elif sort_by == "Watchers":
+        page_order = _page_order(-fields["watchers"], start_idx, end_idx)
+    elif sort_by == "End Time":
+        # NaT sorts last, so items without an end time go to the back
+        page_order = _page_order(fields["end_time"], start_idx, end_idx)
+    else:
+        page_order = np.arange(start_idx, min(end_idx, len(items)))
+    
+    # Format the page's end times up front so the card loop only fills templates
+    end_times = fields["end_time"][page_order]
+    end_labels = np.where(
+        np.isnat(end_times), "N/A", np.char.replace(np.datetime_as_string(end_times, unit="m"), "T", " ")
+    )
+    
+    # Build every card first, then render the whole page as one element
+    cards = []
+    for i, end_label in zip(page_order.tolist(), end_labels.tolist()):
+        item = items[i]
+        # Optional lines are pre-rendered so the card template has no branches
+        shipping = item["shipping"]
+        watchers = item.get("watchers")
+        # Only the fields the template uses; text from eBay is escaped before it goes into HTML
+        cards.append(CARD_TEMPLATE.format_map({
+            "title": html.escape(item["title"] or ""),
+            "url": html.escape(item["url"] or ""),
+            "image": html.escape(item["image"] or ""),
+            "condition": html.escape(item["condition"] or ""),
+            "price": item["price"],
+            "shipping_html": SHIPPING_HTML.format(shipping) if shipping > 0 else FREE_SHIPPING_HTML,
+            "watchers_html": WATCHERS_HTML.format(int(watchers)) if watchers is not None else "",
+            "end_time": end_label
+        }))
+    
+    st.markdown(ITEMS_LIST_HTML.format("".join(cards)), unsafe_allow_html=True)
 
-def display_metrics(active_stats, sold_stats, fee_rate):
+def display_metrics(active_stats, sold_stats, market, fee_rate):
     """Display key metrics and statistics"""
     st.markdown("### 📊 Market Analysis")
     
@@ -79,10 +109,9 @@ def display_metrics(active_stats, sold_stats, fee_rate):
         )
     
     with col3:
-        sell_through = (sold_stats["count"] / (active_stats["count"] + sold_stats["count"])) * 100 if (active_stats["count"] + sold_stats["count"]) > 0 else 0
         st.metric(
             "Sell-Through Rate",
-            f"{sell_through:.1f}%"
+            f"{market['sell_through_rate']:.1f}%"
         )
     
     with col4:
@@ -96,13 +125,16 @@ def display_metrics(active_stats, sold_stats, fee_rate):
     
     with col5:
         st.markdown("#### Price Range")
-        st.markdown(f"**Active:** ${active_stats['min_price']:.2f} - ${active_stats['max_price']:.2f}")
-        st.markdown(f"**Sold:** ${sold_stats['min_price']:.2f} - ${sold_stats['max_price']:.2f}")
+        # Dollar signs are escaped; two unescaped $ on a line render as inline LaTeX
+        st.markdown(f"**Active:** \\${active_stats['min_price']:.2f} - \\${active_stats['max_price']:.2f}")
+        st.markdown(f"**Sold:** \\${sold_stats['min_price']:.2f} - \\${sold_stats['max_price']:.2f}")
+        st.markdown(f"**Median:** \\${active_stats['median_price']:.2f} active / \\${sold_stats['median_price']:.2f} sold")
+        st.markdown(f"**Avg. incl. Shipping:** \\${active_stats['avg_total']:.2f} active / \\${sold_stats['avg_total']:.2f} sold")
     
     with col6:
         st.markdown("#### Market Health")
-        if active_stats["count"] > 0 and sold_stats["count"] > 0:
-            price_diff = ((active_stats["avg_price"] - sold_stats["avg_price"]) / sold_stats["avg_price"]) * 100
+        price_diff = market["price_trend"]
+        if price_diff is not None:
             st.markdown(f"**Price Trend:** {'📈' if price_diff > 0 else '📉'} {abs(price_diff):.1f}%")
         else:
             st.markdown("**Price Trend:** Insufficient data") 
\ No newline at end of file
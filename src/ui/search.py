@@ -1,6 +1,17 @@
 import streamlit as st
 from src.utils.logging import log_debug
 from src.data.storage import save_recent_searches
+from src.utils.images import prepare_upload
+
+MAX_RECENT_SEARCHES = 10
+
+# Search form options
+FLIP_TYPES = ("Retail Arbitrage", "Thrift Store", "Garage Sale", "Other")
+CATEGORIES = ("Electronics", "Clothing", "Collectibles", "Home & Garden", "Toys", "Books", "Other")
+
+def recent_search_key(query):
+    """Normalize a query for duplicate checks so case and spacing differences match"""
+    return " ".join(query.split()).casefold()
 
 def display_search_form():
     """Display search form with text and image search options"""
@@ -20,7 +31,7 @@ def display_search_form():
         with col1b:
             flip_type = st.selectbox(
                 "Flip Type",
-                ["Retail Arbitrage", "Thrift Store", "Garage Sale", "Other"]
+                FLIP_TYPES
             )
         
         # Cost and category
@@ -30,7 +41,7 @@ def display_search_form():
         with col1d:
             category = st.selectbox(
                 "Category",
-                ["Electronics", "Clothing", "Collectibles", "Home & Garden", "Toys", "Books", "Other"]
+                CATEGORIES
             )
     
     with col2:
@@ -39,8 +50,10 @@ def display_search_form():
         uploaded_file = st.file_uploader("Upload an image", type=["jpg", "jpeg", "png"])
         
         if uploaded_file is not None:
-            st.session_state.camera_photo = uploaded_file
-            st.image(uploaded_file, caption="Uploaded Image", use_column_width=True)
+            # One cached resize gives a WebP preview for the browser and a 640px JPEG
+            # kept for image search instead of the full-resolution upload
+            preview, st.session_state.camera_photo = prepare_upload(uploaded_file.getvalue())
+            st.image(preview, caption="Uploaded Image", use_container_width=True)
     
     # Search button
     if st.button("Search", type="primary"):
@@ -58,11 +71,16 @@ def display_search_form():
             # Save to session state
             st.session_state.last_search = search_params
             
-            # Add to recent searches
-            if query:
-                st.session_state.recent_searches.insert(0, query)
-                st.session_state.recent_searches = st.session_state.recent_searches[:10]
-                save_recent_searches(st.session_state.recent_searches)
+            # Add to recent searches, skipping ones already listed
+            key = recent_search_key(query)
+            if key and key not in st.session_state.recent_query_set:
+                recent = st.session_state.recent_searches
+                # The bounded deque evicts its oldest entry on appendleft
+                if len(recent) == recent.maxlen:
+                    st.session_state.recent_query_set.discard(recent_search_key(recent[-1]))
+                recent.appendleft(query.strip())
+                st.session_state.recent_query_set.add(key)
+                save_recent_searches(recent)
             
             return True
     
@@ -77,4 +95,4 @@ def show_recent_searches():
             with cols[i % 5]:
                 if st.button(search, key=f"recent_{i}"):
                     st.session_state.last_search = {"query": search}
-                    st.experimental_rerun() 
\ No newline at end of file
+                    st.rerun() 
\ No newline at end of file
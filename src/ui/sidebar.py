@@ -1,6 +1,10 @@
 import streamlit as st
 from src.utils.logging import log_debug
 
+# Condition filter options
+CONDITIONS = ("any", "new", "used")
+CONDITION_INDEX = {condition: i for i, condition in enumerate(CONDITIONS)}
+
 def display_sidebar():
     """Display sidebar with filter settings and debug info"""
     with st.sidebar:
@@ -18,8 +22,8 @@ def display_sidebar():
         # Condition filter
         condition = st.selectbox(
             "Condition",
-            ["any", "new", "used"],
-            index=["any", "new", "used"].index(st.session_state.filter_settings["condition"])
+            CONDITIONS,
+            index=CONDITION_INDEX.get(st.session_state.filter_settings["condition"], 0)
         )
         
         # Days sold filter
@@ -54,11 +58,8 @@ def display_sidebar():
             help="Turn off to use real eBay API data (requires valid credentials)"
         )
         st.session_state.use_mock = use_mock
-        if "ebay_api" in st.session_state:
-            st.session_state.ebay_api.set_mock_mode(use_mock)
         
         # Debug section
         if st.checkbox("Show Debug Info"):
             st.markdown("### 🐛 Debug Info")
-            for info in st.session_state.debug_info:
-                st.text(info) 
\ No newline at end of file
+            st.text("\n".join(st.session_state.debug_info)) 
\ No newline at end of file
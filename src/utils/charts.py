@@ -1,83 +1,116 @@
-import plotly.express as px
-import plotly.graph_objects as go
+import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+import orjson
 
-def generate_price_chart(active_items, sold_items):
-    """Generate price distribution chart"""
-    if not active_items and not sold_items:
+# Charts rarely get more than this many horizontal pixels, so more points only add payload
+MAX_CHART_POINTS = 1000
+
+# Static layout for the price distribution figure
+PRICE_CHART_LAYOUT = {
+    "barmode": "overlay",
+    "title": {"text": "Price Distribution"},
+    "showlegend": True,
+    "legend": {"title": {"text": "Listing Type"}},
+    "xaxis": {"title": {"text": "Price ($)"}},
+    "yaxis": {"title": {"text": "Count"}}
+}
+
+# Static layout for the sales volume figure
+VOLUME_CHART_LAYOUT = {
+    "title": {"text": "Sales Volume Over Time"},
+    "showlegend": False,
+    "xaxis": {"title": {"text": "Date"}},
+    "yaxis": {"title": {"text": "Number of Sales"}}
+}
+
+def downsample(df, x_col, y_col, n_out=MAX_CHART_POINTS):
+    """Reduce an x-sorted frame to at most n_out rows with M4 (first/last/min/max per x bucket)"""
+    if len(df) <= n_out:
+        return df
+    
+    x = df[x_col].to_numpy()
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.view(np.int64)
+    offsets = (x - x[0]).astype(np.float64)
+    y = df[y_col].to_numpy(np.float64)
+    
+    # Split the x range into equal-width buckets; each contributes at most four rows
+    n_buckets = max(n_out // 4, 1)
+    span = offsets[-1]
+    if span <= 0:
+        return df.iloc[[0, len(df) - 1]]
+    buckets = np.minimum((offsets * (n_buckets / span)).astype(np.int64), n_buckets - 1)
+    
+    # Rows are x-sorted, so bucket runs give first/last; sorting by (bucket, y) gives min/max
+    edges = np.flatnonzero(np.diff(buckets)) + 1
+    first = np.r_[0, edges]
+    last = np.r_[edges - 1, len(df) - 1]
+    by_value = np.lexsort((y, buckets))
+    keep = np.unique(np.concatenate([first, last, by_value[first], by_value[last]]))
+    return df.iloc[keep]
+
+def generate_price_chart(active_prices, sold_prices):
+    """Generate price distribution chart from active and sold price arrays"""
+    if not active_prices.size and not sold_prices.size:
         return None
     
-    # Create DataFrame for active items
-    active_df = pd.DataFrame(active_items)
-    active_df["type"] = "Active"
-    
-    # Create DataFrame for sold items
-    sold_df = pd.DataFrame(sold_items)
-    sold_df["type"] = "Sold"
-    
-    # Combine DataFrames
-    df = pd.concat([active_df, sold_df])
-    
-    # Create histogram
-    fig = px.histogram(
-        df,
-        x="price",
-        color="type",
-        barmode="overlay",
-        title="Price Distribution",
-        labels={"price": "Price ($)", "type": "Listing Type"},
-        nbins=20
-    )
-    
-    # Update layout
-    fig.update_layout(
-        showlegend=True,
-        legend_title="Listing Type",
-        xaxis_title="Price ($)",
-        yaxis_title="Count"
-    )
-    
-    return fig
+    # Key the cached figure on the prices alone so unrelated reruns reuse it.
+    # The cache holds figure JSON; a plain dict skips rebuilding a Figure from a pickle.
+    return orjson.loads(_price_chart(active_prices, sold_prices))
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _price_chart(active_prices, sold_prices):
+    """Build the price distribution figure from price arrays, as JSON"""
+    # Imported here so reruns that draw no charts skip loading plotly
+    import plotly.graph_objects as go
+    
+    # Bin both series on shared edges so only bin counts are sent to the browser
+    edges = np.histogram_bin_edges(np.concatenate([active_prices, sold_prices]), bins=20)
+    centers = (edges[:-1] + edges[1:]) / 2
+    widths = np.diff(edges)
+    
+    traces = [
+        go.Bar(x=centers, y=np.histogram(prices, bins=edges)[0], width=widths, name=name, opacity=0.75)
+        for name, prices in (("Active", active_prices), ("Sold", sold_prices))
+        if prices.size
+    ]
+    
+    # Build the figure with its traces and layout in one constructor call
+    return go.Figure(data=traces, layout=PRICE_CHART_LAYOUT).to_json()
 
-def generate_volume_chart(active_items, sold_items):
-    """Generate sales volume chart"""
-    if not active_items and not sold_items:
+def generate_volume_chart(active_end_times, sold_end_times):
+    """Generate sales volume chart from active and sold end_time arrays"""
+    if not active_end_times.size and not sold_end_times.size:
         return None
     
-    # Create DataFrame for sold items
-    sold_df = pd.DataFrame(sold_items)
-    
-    # Convert end_time to datetime
-    sold_df["end_time"] = pd.to_datetime(sold_df["end_time"])
-    
-    # Group by date and count
-    daily_sales = sold_df.groupby(sold_df["end_time"].dt.date).size().reset_index()
-    daily_sales.columns = ["date", "count"]
-    
-    # Create line chart
-    fig = px.line(
-        daily_sales,
-        x="date",
-        y="count",
-        title="Sales Volume Over Time",
-        labels={"date": "Date", "count": "Number of Sales"}
-    )
-    
-    # Update layout
-    fig.update_layout(
-        xaxis_title="Date",
-        yaxis_title="Number of Sales",
-        showlegend=False
-    )
+    figure_json = _volume_chart(sold_end_times)
+    return orjson.loads(figure_json) if figure_json else None
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _volume_chart(end_times):
+    """Build the sales volume figure from sold end_time values, as JSON"""
+    import plotly.graph_objects as go
+    
+    # Bucket sales by day, dropping missing times; np.unique sorts and counts in one call
+    days = end_times[~np.isnat(end_times)].astype("datetime64[D]")
+    if not days.size:
+        return None
+    dates, counts = np.unique(days, return_counts=True)
     
-    return fig
+    # One line trace; go.Scatter skips px's DataFrame and figure-factory work
+    return go.Figure(
+        data=[go.Scatter(x=np.datetime_as_string(dates), y=counts, mode="lines")],
+        layout=VOLUME_CHART_LAYOUT
+    ).to_json()
 
 def generate_profit_chart(flips_df):
     """Generate profit over time chart"""
     if flips_df.empty:
         return None
     
+    import plotly.express as px
+    
     # Convert date to datetime
     flips_df["date"] = pd.to_datetime(flips_df["date"])
     
@@ -87,9 +120,9 @@ def generate_profit_chart(flips_df):
     # Calculate cumulative profit
     flips_df["cumulative_profit"] = flips_df["profit"].cumsum()
     
-    # Create line chart
+    # Create line chart from the downsampled points
     fig = px.line(
-        flips_df,
+        downsample(flips_df, "date", "cumulative_profit"),
         x="date",
         y="cumulative_profit",
         title="Cumulative Profit Over Time",
@@ -110,6 +143,8 @@ def generate_category_chart(flips_df):
     if flips_df.empty:
         return None
     
+    import plotly.express as px
+    
     # Group by category and sum profits
     category_profit = flips_df.groupby("category")["profit"].sum().reset_index()
     
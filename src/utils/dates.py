@@ -0,0 +1,11 @@
+from datetime import datetime
+from functools import lru_cache
+
+@lru_cache(maxsize=4096)
+def parse_ebay_time(value):
+    """Parse an eBay timestamp such as 2024-05-01T10:00:00.000Z, or None if malformed"""
+    try:
+        # fromisoformat parses in C; the first 19 characters drop the millis and Z suffix
+        return datetime.fromisoformat(value[:19])
+    except (TypeError, ValueError):
+        return None
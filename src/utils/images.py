@@ -0,0 +1,33 @@
+import io
+import hashlib
+import streamlit as st
+from PIL import Image, UnidentifiedImageError
+
+# Configuration
+IMAGE_MAX_SIZE = (640, 640)
+IMAGE_QUALITY = 80
+
+def _image_key(image_bytes):
+    """Short content hash used to key cached image resizes"""
+    return hashlib.blake2b(image_bytes, digest_size=8).hexdigest()
+
+def prepare_upload(image_bytes):
+    """Shrink an uploaded image once; returns (WebP preview, JPEG photo for image search)"""
+    return _resize_upload(_image_key(image_bytes), image_bytes)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _resize_upload(key, _image_bytes):
+    """Decode and resize an upload, then encode both outputs; cached on the content hash, not the raw bytes"""
+    try:
+        with Image.open(io.BytesIO(_image_bytes)) as img:
+            img.thumbnail(IMAGE_MAX_SIZE, Image.Resampling.LANCZOS)
+            # JPEG has no alpha channel, so flatten transparent PNGs first
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            preview = io.BytesIO()
+            img.save(preview, format="WEBP", quality=IMAGE_QUALITY, method=4)
+            photo = io.BytesIO()
+            img.save(photo, format="JPEG", quality=IMAGE_QUALITY, optimize=True)
+            return preview.getvalue(), photo.getvalue()
+    except (UnidentifiedImageError, OSError, ValueError):
+        return _image_bytes, _image_bytes
@@ -1,23 +1,27 @@
 import streamlit as st
-from datetime import datetime
+from collections import deque
+import os
+import time
+
+MAX_DEBUG_MESSAGES = 100
+# Set KWIKFLIP_DEBUG=1 to also log expensive diagnostics such as full tracebacks
+DEBUG = os.getenv("KWIKFLIP_DEBUG", "0") == "1"
 
 def log_debug(message):
     """Log debug message to session state"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # time.strftime formats the current local time without building a datetime
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
     debug_message = f"[{timestamp}] {message}"
     
-    # Add to session state debug info
+    # Add to session state debug info; the deque drops messages beyond the last 100
     if "debug_info" not in st.session_state:
-        st.session_state.debug_info = []
+        st.session_state.debug_info = deque(maxlen=MAX_DEBUG_MESSAGES)
     
     st.session_state.debug_info.append(debug_message)
-    
-    # Keep only last 100 messages
-    st.session_state.debug_info = st.session_state.debug_info[-100:]
 
 def clear_debug_log():
     """Clear debug log"""
-    st.session_state.debug_info = []
+    st.session_state.debug_info = deque(maxlen=MAX_DEBUG_MESSAGES)
 
 def get_debug_log():
     """Get debug log"""
@@ -1,42 +1,91 @@
-def calculate_stats(items):
-    """Calculate statistics for a list of items"""
-    if not items:
+import numpy as np
+from src.utils.dates import parse_ebay_time
+
+# Per-item fields used by the stats, charts and result sorting; end_time is NaT when missing or malformed
+ITEM_FIELDS = np.dtype([
+    ("price", np.float64),
+    ("shipping", np.float64),
+    ("watchers", np.int64),
+    ("end_time", "datetime64[s]")
+])
+
+def item_arrays(items):
+    """Pack each item's numeric fields and end time into one structured array in a single pass"""
+    return np.fromiter(
+        (
+            (item["price"], item.get("shipping", 0), item.get("watchers") or 0, parse_ebay_time(item.get("end_time")))
+            for item in items
+        ),
+        dtype=ITEM_FIELDS,
+        count=len(items)
+    )
+
+def calculate_stats(fields):
+    """Calculate statistics for items packed by item_arrays"""
+    if not fields.size:
         return {
             "count": 0,
             "avg_price": 0,
             "min_price": 0,
             "max_price": 0,
+            "median_price": 0,
+            "total_value": 0,
+            "avg_total": 0,
             "total_watchers": 0
         }
     
-    prices = [item["price"] for item in items]
-    watchers = [item["watchers"] for item in items]
+    prices = fields["price"]
+    shipping = fields["shipping"]
+    watchers = fields["watchers"]
+    
+    # Median by selection rather than sorting; even counts average the two middle values
+    k = prices.size // 2
+    if prices.size % 2:
+        median = np.partition(prices, k)[k]
+    else:
+        middle = np.partition(prices, (k - 1, k))
+        median = (middle[k - 1] + middle[k]) / 2
     
     return {
-        "count": len(items),
-        "avg_price": sum(prices) / len(prices) if prices else 0,
-        "min_price": min(prices) if prices else 0,
-        "max_price": max(prices) if prices else 0,
-        "total_watchers": sum(watchers)
+        "count": int(fields.size),
+        "avg_price": float(prices.mean()),
+        "min_price": float(prices.min()),
+        "max_price": float(prices.max()),
+        "median_price": float(median),
+        "total_value": float(prices.sum()),
+        "avg_total": float((prices + shipping).mean()),
+        "total_watchers": int(watchers.sum())
     }
 
-def calculate_sell_through_rate(active_items, sold_items):
-    """Calculate sell-through rate"""
-    total_items = len(active_items) + len(sold_items)
+def calculate_market_summary(active_fields, sold_fields):
+    """Calculate active and sold stats plus the derived market metrics in one call.
+    
+    Returns (active_stats, sold_stats, market); market holds the sell-through
+    rate and the active-vs-sold price trend (None when there is not enough data).
+    """
+    market = {
+        "sell_through_rate": calculate_sell_through_rate(active_fields, sold_fields),
+        "price_trend": calculate_price_trend(active_fields, sold_fields)
+    }
+    return calculate_stats(active_fields), calculate_stats(sold_fields), market
+
+def calculate_sell_through_rate(active_fields, sold_fields):
+    """Calculate sell-through rate from active and sold items packed by item_arrays"""
+    total_items = active_fields.size + sold_fields.size
     if total_items == 0:
         return 0
-    return (len(sold_items) / total_items) * 100
+    return (sold_fields.size / total_items) * 100
 
-def calculate_price_trend(active_items, sold_items):
-    """Calculate price trend between active and sold items"""
-    if not active_items or not sold_items:
-        return 0
+def calculate_price_trend(active_fields, sold_fields):
+    """Calculate price trend between active and sold items packed by item_arrays, or None if either side has no prices"""
+    if not active_fields.size or not sold_fields.size:
+        return None
     
-    active_avg = sum(item["price"] for item in active_items) / len(active_items)
-    sold_avg = sum(item["price"] for item in sold_items) / len(sold_items)
+    active_avg = float(active_fields["price"].mean())
+    sold_avg = float(sold_fields["price"].mean())
     
     if sold_avg == 0:
-        return 0
+        return None
     
     return ((active_avg - sold_avg) / sold_avg) * 100
 
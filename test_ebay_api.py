@@ -2,7 +2,11 @@ import os
 from dotenv import load_dotenv
 import traceback
 
+import orjson
+import pytest
+
 # Import our EbayAPI class
+from src.api import ebay_api
 from src.api.ebay_api import EbayAPI
 
 def test_ebay_api():
@@ -57,6 +61,94 @@ def test_ebay_api():
                 for key, value in items[0].items():
                     print(f"  {key}: {value}")
 
+class _StubResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.content = orjson.dumps(payload)
+        self.text = self.content.decode()
+
+    def json(self):
+        return orjson.loads(self.content)
+
+class _StubSession:
+    """Records requests instead of sending them to eBay"""
+    def __init__(self):
+        self.posts = []
+        self.gets = []
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        self.posts.append((url, headers, data))
+        return _StubResponse(200, {"access_token": "real-token", "expires_in": 7200})
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.gets.append((url, headers, params))
+        return _StubResponse(200, {"itemSummaries": []})
+
+def test_non_mock_fetch_requests_real_token(tmp_path, monkeypatch):
+    """A per-call use_mock=False must fetch a real OAuth token even though the shared instance defaults to mock"""
+    monkeypatch.setattr(ebay_api, "TOKEN_CACHE_FILE", tmp_path / "ebay_token.json")
+    api = EbayAPI()
+    api.set_credentials("app", "cert", "dev")
+    api.session = _StubSession()
+
+    items, error = api.fetch_items("iphone", sold=False, use_mock=False)
+
+    assert error is None
+    assert len(api.session.posts) == 1
+    assert api.session.posts[0][0] == ebay_api.OAUTH_TOKEN_URL
+    assert api.session.gets[0][1]["Authorization"] == "Bearer real-token"
+
+def test_malformed_token_cache_is_a_miss(tmp_path, monkeypatch):
+    """A token cache file of the wrong shape is ignored and a fresh token is requested"""
+    cache_file = tmp_path / "ebay_token.json"
+    monkeypatch.setattr(ebay_api, "TOKEN_CACHE_FILE", cache_file)
+    for content in (b"[1, 2]", b'{"app_id": "app", "token": "stale", "expiry": "soon"}'):
+        cache_file.write_bytes(content)
+        api = EbayAPI()
+        api.set_credentials("app", "cert", "dev")
+        api.session = _StubSession()
+
+        items, error = api.fetch_items("iphone", sold=False, use_mock=False)
+
+        assert error is None
+        assert len(api.session.posts) == 1
+
+class _ScriptedAPI:
+    """Returns queued fetch results and counts how often it is asked"""
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def fetch_items(self, query, sold=False, filters=None, limit=30, use_mock=None):
+        self.calls += 1
+        return self.results.pop(0)
+
+@pytest.mark.parametrize("failure", [([], "eBay API error: 500"), ([], None)], ids=["error", "empty"])
+def test_failed_fetch_is_not_kept_in_long_cache(failure):
+    """Errors and empty results only live in the short cache; a later success is fetched and then kept"""
+    ebay_api._fetch_items_ok.clear()
+    ebay_api.cached_fetch_items.clear()
+    item = {"price": 10.0, "shipping": 0.0, "watchers": 1, "end_time": "2024-05-01T10:00:00.000Z"}
+    api = _ScriptedAPI(failure, ([item], None))
+
+    items, fields, error = ebay_api.cached_fetch_items(api, "lego", use_mock=False)
+    assert (items, error) == failure
+
+    # The short cache remembers the failure...
+    ebay_api.cached_fetch_items(api, "lego", use_mock=False)
+    assert api.calls == 1
+
+    # ...but once it expires, the 600s cache has nothing for this query
+    ebay_api.cached_fetch_items.clear()
+    items, fields, error = ebay_api.cached_fetch_items(api, "lego", use_mock=False)
+    assert api.calls == 2
+    assert items == [item] and error is None and fields["price"].tolist() == [10.0]
+
+    # The success is kept in the long cache
+    ebay_api.cached_fetch_items.clear()
+    ebay_api.cached_fetch_items(api, "lego", use_mock=False)
+    assert api.calls == 2
+
 if __name__ == "__main__":
     try:
         test_ebay_api()
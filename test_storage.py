@@ -0,0 +1,80 @@
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add the project root to path so we can import our modules
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.data import storage
+
+FLIP = {
+    "date": "2025-04-28",
+    "query": "lego",
+    "category": "Toys",
+    "flip_type": "Thrift Store",
+    "cost": 12.5,
+    "selling_price": 30.0,
+    "shipping_cost": 4.25,
+    "additional_costs": 0.0,
+    "ebay_fee": 0.1,
+    "paypal_fee": 1.17,
+    "profit": 11.98,
+    "roi": 73.3
+}
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Run storage against a fresh data/ directory with empty caches"""
+    monkeypatch.chdir(tmp_path)
+    storage._load_flips_cached.clear()
+    storage._flips_excel_bytes.clear()
+    yield tmp_path / "data"
+    storage._load_flips_cached.clear()
+    storage._flips_excel_bytes.clear()
+
+def test_export_round_trips_money_values(data_dir):
+    """Saved amounts come back from the xlsx export exactly as entered"""
+    storage.save_flip(dict(FLIP))
+
+    exported = pd.read_excel(io.BytesIO(storage.export_flips_bytes()), sheet_name="Flips")
+
+    row = exported.iloc[0]
+    for col in storage.FLIP_NUMERIC_COLUMNS:
+        assert row[col] == FLIP[col], col
+    assert row["query"] == "lego"
+
+def test_save_flip_new_file_writes_header(data_dir):
+    """The first save creates the file with the standard header"""
+    storage.save_flip(dict(FLIP))
+
+    lines = (data_dir / "flips.csv").read_text().splitlines()
+    assert lines[0].split(",") == storage.FLIP_COLUMNS
+    assert len(lines) == 2
+
+def test_save_flip_empty_file_writes_header(data_dir):
+    """An existing but empty file is treated like a new one"""
+    data_dir.mkdir()
+    (data_dir / "flips.csv").write_text("")
+
+    storage.save_flip(dict(FLIP))
+
+    lines = (data_dir / "flips.csv").read_text().splitlines()
+    assert lines[0].split(",") == storage.FLIP_COLUMNS
+    assert len(lines) == 2
+
+def test_save_flip_reuses_old_header(data_dir):
+    """Rows appended to an older file follow that file's column order and skip unknown columns"""
+    data_dir.mkdir()
+    old_header = ["query", "date", "cost", "profit"]
+    (data_dir / "flips.csv").write_text(",".join(old_header) + "\nold,2024-01-01,1.0,2.0\n")
+
+    storage.save_flip(dict(FLIP))
+    storage.save_flip(dict(FLIP, query="second"))
+
+    lines = (data_dir / "flips.csv").read_text().splitlines()
+    assert lines[0].split(",") == old_header
+    assert lines[2:] == ["lego,2025-04-28,12.5,11.98", "second,2025-04-28,12.5,11.98"]
+    assert storage.load_flips()["query"].tolist() == ["old", "lego", "second"]